@@ -4,6 +4,14 @@ import os
 from datetime import datetime
 import mysql.connector
 from mysql.connector import Error
+from customer_summary import (
+    CustomerSummaryCache,
+    ensure_customer_summaries,
+    fetch_summary,
+    record_refund,
+    record_review,
+)
+from fast_json import RowLayout, rows_response
 
 app = Flask(__name__)
 
@@ -13,6 +21,21 @@ app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'root')
 app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', 'sath')
 app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'swiftrefund')
 
+# Refund risk configuration: a negative review from a customer refunded within
+# the window who also crosses either limit gets a refund queued for review
+# instead of an expedited one
+app.config['REFUND_RISK_WINDOW_DAYS'] = int(os.getenv('REFUND_RISK_WINDOW_DAYS', 30))
+app.config['REFUND_RISK_MAX_NEGATIVE_REVIEWS'] = int(os.getenv('REFUND_RISK_MAX_NEGATIVE_REVIEWS', 3))
+app.config['REFUND_RISK_MAX_REFUNDED'] = float(os.getenv('REFUND_RISK_MAX_REFUNDED', 500))
+
+# In-memory LRU over the customer_summaries table for the summary endpoint.
+# Entries expire after CUSTOMER_SUMMARY_CACHE_TTL seconds so writes from other
+# processes show up
+customer_summaries = CustomerSummaryCache(
+    capacity=int(os.getenv('CUSTOMER_SUMMARY_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('CUSTOMER_SUMMARY_CACHE_TTL', 5))
+)
+
 def get_db():
     """Get MySQL database connection (Flask 3.0 compatible)"""
     if 'db' not in g:
@@ -25,11 +48,6 @@ def get_db():
         )
     return g.db
 
-def get_cursor():
-    """Get MySQL cursor with dictionary results"""
-    db = get_db()
-    return db.cursor(dictionary=True)
-
 @app.teardown_appcontext
 def close_db(error):
     """Close database connection at the end of request"""
@@ -98,6 +116,9 @@ def init_database():
         
         conn.commit()
         cursor.close()
+        
+        # Create customer summaries table, backfilling it from existing data once
+        ensure_customer_summaries(conn)
         conn.close()
         print("Database initialized successfully!")
     except Error as e:
@@ -128,6 +149,205 @@ def analyze_sentiment(text):
         'subjectivity': subjectivity
     }
 
+def is_high_risk_customer(summary):
+    """Check whether a customer's refund history rules out an expedited refund"""
+    seconds_since_last_refund = summary['seconds_since_last_refund']
+    if seconds_since_last_refund is None:
+        return False
+    
+    if seconds_since_last_refund > app.config['REFUND_RISK_WINDOW_DAYS'] * 86400:
+        return False
+    
+    return (summary['negative_review_count'] >= app.config['REFUND_RISK_MAX_NEGATIVE_REVIEWS']
+            or float(summary['total_refunded']) >= app.config['REFUND_RISK_MAX_REFUNDED'])
+
+def get_customer_summary(db, customer_id):
+    """Get a customer's refund history aggregates, possibly cached for a few seconds"""
+    return customer_summaries.get(db, customer_id)
+
+def insert_review(db, customer_id, review_text, sentiment_data):
+    """Store a scored review, count it in the customer's summary and return its id"""
+    negative = sentiment_data['sentiment'] == 'negative'
+    cur = db.cursor()
+    try:
+        cur.execute("""
+            INSERT INTO reviews (customer_id, review_text, sentiment, polarity, subjectivity)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (customer_id, review_text, sentiment_data['sentiment'], 
+              sentiment_data['polarity'], sentiment_data['subjectivity']))
+        
+        review_id = cur.lastrowid
+        record_review(cur, customer_id, negative)
+        db.commit()
+    except Exception as db_error:
+        db.rollback()
+        raise Exception(f"Database error: {str(db_error)}")
+    finally:
+        cur.close()
+    customer_summaries.invalidate(customer_id)
+    return review_id
+
+def insert_refund_transaction(db, customer_id, amount, review_id):
+    """Create a refund transaction for a negative review and return (its id, whether it was expedited)
+
+    The customer's summary row stays locked until commit, so concurrent refunds
+    for one customer are decided one at a time. Expedited refunds are counted
+    in the summary right away; refunds queued for review are counted by
+    mark_refund_processed().
+    """
+    try:
+        amount = float(amount)
+        summary = fetch_summary(db, customer_id, for_update=True)
+        # insert_review already counted this review; judge the history before it
+        history = dict(summary, negative_review_count=max(summary['negative_review_count'] - 1, 0))
+        expedited = not is_high_risk_customer(history)
+        
+        if expedited:
+            status, refund_status, priority = 'processing', 'expedited', 'high'
+        else:
+            status, refund_status, priority = 'pending', 'under_review', 'normal'
+        cur = db.cursor()
+        cur.execute("""
+            INSERT INTO transactions (customer_id, amount, status, refund_status, review_id, priority)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (customer_id, amount, status, refund_status, review_id, priority))
+        
+        transaction_id = cur.lastrowid
+        if expedited:
+            record_refund(cur, customer_id, amount)
+        db.commit()
+        cur.close()
+    except Exception as db_error:
+        db.rollback()
+        raise Exception(f"Error creating refund transaction: {str(db_error)}")
+    if expedited:
+        customer_summaries.invalidate(customer_id)
+    return transaction_id, expedited
+
+def build_review_response(review_id, sentiment_data, transaction_id=None, expedited=True):
+    """Build the JSON body returned by submit_review"""
+    refund_triggered = transaction_id is not None
+    if not refund_triggered:
+        message = 'Review processed successfully'
+    elif expedited:
+        message = 'Refund expedited due to negative review'
+    else:
+        message = 'Refund queued for review due to customer refund history'
+    
+    response = {
+        'review_id': review_id,
+        'sentiment': sentiment_data['sentiment'],
+        'polarity': sentiment_data['polarity'],
+        'subjectivity': sentiment_data['subjectivity'],
+        'refund_triggered': refund_triggered,
+        'message': message
+    }
+    
+    if transaction_id:
+        response['transaction_id'] = transaction_id
+        response['refund_status'] = 'expedited' if expedited else 'under_review'
+    
+    return response
+
+# Columns the dashboard reads, in SELECT order
+REVIEW_LAYOUT = RowLayout('id', 'customer_id', 'review_text', 'sentiment', 'polarity',
+                          'created_at', 'transaction_id')
+TRANSACTION_LAYOUT = RowLayout('id', 'customer_id', 'amount', 'status', 'refund_status',
+                               'priority', 'created_at', 'sentiment')
+
+def fetch_reviews(db):
+    """Fetch the latest reviews with their refund transaction, if any (rows follow REVIEW_LAYOUT)"""
+    cur = db.cursor()
+    cur.execute("""
+        SELECT r.id, r.customer_id, r.review_text, r.sentiment, r.polarity,
+               r.created_at, t.id as transaction_id
+        FROM reviews r
+        LEFT JOIN transactions t ON r.id = t.review_id
+        ORDER BY r.created_at DESC
+        LIMIT 100
+    """)
+    reviews = cur.fetchall()
+    cur.close()
+    return reviews
+
+def fetch_transactions(db):
+    """Fetch the latest transactions with their originating review, if any (rows follow TRANSACTION_LAYOUT)"""
+    cur = db.cursor()
+    cur.execute("""
+        SELECT t.id, t.customer_id, t.amount, t.status, t.refund_status,
+               t.priority, t.created_at, r.sentiment
+        FROM transactions t
+        LEFT JOIN reviews r ON t.review_id = r.id
+        ORDER BY t.created_at DESC
+        LIMIT 100
+    """)
+    transactions = cur.fetchall()
+    cur.close()
+    return transactions
+
+def mark_refund_processed(db, transaction_id):
+    """Mark a refund transaction as completed, counting refunds that were queued for review"""
+    cur = db.cursor()
+    cur.execute("""
+        SELECT customer_id, amount, refund_status
+        FROM transactions
+        WHERE id = %s
+        FOR UPDATE
+    """, (transaction_id,))
+    row = cur.fetchone()
+    cur.execute("""
+        UPDATE transactions
+        SET status = 'completed', refund_status = 'processed', processed_at = NOW()
+        WHERE id = %s
+    """, (transaction_id,))
+    
+    # Expedited refunds were counted when created; processed ones must not count twice
+    counted = row is not None and row[2] == 'under_review'
+    if counted:
+        record_refund(cur, row[0], row[1])
+    db.commit()
+    cur.close()
+    if counted:
+        customer_summaries.invalidate(row[0])
+
+def fetch_stats(db):
+    """Compute review and refund statistics"""
+    cur = db.cursor(dictionary=True)
+    
+    # Total reviews
+    cur.execute("SELECT COUNT(*) as total FROM reviews")
+    total_reviews = cur.fetchone()['total']
+    
+    # Sentiment distribution
+    cur.execute("""
+        SELECT sentiment, COUNT(*) as count
+        FROM reviews
+        GROUP BY sentiment
+    """)
+    sentiment_dist = {row['sentiment']: row['count'] for row in cur.fetchall()}
+    
+    # Total transactions
+    cur.execute("SELECT COUNT(*) as total FROM transactions")
+    total_transactions = cur.fetchone()['total']
+    
+    # Expedited refunds
+    cur.execute("SELECT COUNT(*) as total FROM transactions WHERE priority = 'high'")
+    expedited_refunds = cur.fetchone()['total']
+    
+    # Pending refunds
+    cur.execute("SELECT COUNT(*) as total FROM transactions WHERE refund_status != 'processed'")
+    pending_refunds = cur.fetchone()['total']
+    
+    cur.close()
+    
+    return {
+        'total_reviews': total_reviews,
+        'sentiment_distribution': sentiment_dist,
+        'total_transactions': total_transactions,
+        'expedited_refunds': expedited_refunds,
+        'pending_refunds': pending_refunds
+    }
+
 @app.route('/')
 def index():
     """Home page with review submission form"""
@@ -148,57 +368,16 @@ def submit_review():
         sentiment_data = analyze_sentiment(review_text)
         
         # Store review in database
-        try:
-            cur = get_cursor()
-            cur.execute("""
-                INSERT INTO reviews (customer_id, review_text, sentiment, polarity, subjectivity)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (customer_id, review_text, sentiment_data['sentiment'], 
-                  sentiment_data['polarity'], sentiment_data['subjectivity']))
-            
-            review_id = cur.lastrowid
-            get_db().commit()
-        except Exception as db_error:
-            get_db().rollback()
-            raise Exception(f"Database error: {str(db_error)}")
-        finally:
-            cur.close()
+        review_id = insert_review(get_db(), customer_id, review_text, sentiment_data)
         
-        # If sentiment is negative, trigger expedited refund
-        refund_triggered = False
+        # If sentiment is negative, trigger a refund, expedited unless the customer's history is risky
         transaction_id = None
+        expedited = True
         
         if sentiment_data['sentiment'] == 'negative':
-            try:
-                # Create expedited refund transaction
-                amount = float(data.get('amount', 0))
-                cur = get_cursor()
-                cur.execute("""
-                    INSERT INTO transactions (customer_id, amount, status, refund_status, review_id, priority)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (customer_id, amount, 'processing', 'expedited', review_id, 'high'))
-                
-                transaction_id = cur.lastrowid
-                get_db().commit()
-                refund_triggered = True
-                cur.close()
-            except Exception as db_error:
-                get_db().rollback()
-                raise Exception(f"Error creating refund transaction: {str(db_error)}")
-        
-        response = {
-            'review_id': review_id,
-            'sentiment': sentiment_data['sentiment'],
-            'polarity': sentiment_data['polarity'],
-            'subjectivity': sentiment_data['subjectivity'],
-            'refund_triggered': refund_triggered,
-            'message': 'Refund expedited due to negative review' if refund_triggered else 'Review processed successfully'
-        }
-        
-        if transaction_id:
-            response['transaction_id'] = transaction_id
+            transaction_id, expedited = insert_refund_transaction(get_db(), customer_id, data.get('amount', 0), review_id)
         
-        return jsonify(response), 200
+        return jsonify(build_review_response(review_id, sentiment_data, transaction_id, expedited)), 200
         
     except Exception as e:
         import traceback
@@ -210,18 +389,7 @@ def submit_review():
 def get_reviews():
     """Get all reviews with their sentiment analysis"""
     try:
-        cur = get_cursor()
-        cur.execute("""
-            SELECT r.*, t.id as transaction_id, t.amount, t.refund_status, t.priority
-            FROM reviews r
-            LEFT JOIN transactions t ON r.id = t.review_id
-            ORDER BY r.created_at DESC
-            LIMIT 100
-        """)
-        reviews = cur.fetchall()
-        cur.close()
-        
-        return jsonify(reviews), 200
+        return rows_response(app, REVIEW_LAYOUT, fetch_reviews(get_db())), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -229,18 +397,7 @@ def get_reviews():
 def get_transactions():
     """Get all transactions"""
     try:
-        cur = get_cursor()
-        cur.execute("""
-            SELECT t.*, r.review_text, r.sentiment
-            FROM transactions t
-            LEFT JOIN reviews r ON t.review_id = r.id
-            ORDER BY t.created_at DESC
-            LIMIT 100
-        """)
-        transactions = cur.fetchall()
-        cur.close()
-        
-        return jsonify(transactions), 200
+        return rows_response(app, TRANSACTION_LAYOUT, fetch_transactions(get_db())), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -253,58 +410,26 @@ def dashboard():
 def process_refund(transaction_id):
     """Manually process a refund"""
     try:
-        cur = get_cursor()
-        cur.execute("""
-            UPDATE transactions
-            SET status = 'completed', refund_status = 'processed', processed_at = NOW()
-            WHERE id = %s
-        """, (transaction_id,))
-        get_db().commit()
-        cur.close()
+        mark_refund_processed(get_db(), transaction_id)
         
         return jsonify({'message': 'Refund processed successfully', 'transaction_id': transaction_id}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/customers/<customer_id>/summary')
+def customer_summary(customer_id):
+    """Get a customer's review and refund history aggregates"""
+    try:
+        summary = get_customer_summary(get_db(), customer_id)
+        return jsonify(summary), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/stats')
 def get_stats():
     """Get statistics about reviews and refunds"""
     try:
-        cur = get_cursor()
-        
-        # Total reviews
-        cur.execute("SELECT COUNT(*) as total FROM reviews")
-        total_reviews = cur.fetchone()['total']
-        
-        # Sentiment distribution
-        cur.execute("""
-            SELECT sentiment, COUNT(*) as count
-            FROM reviews
-            GROUP BY sentiment
-        """)
-        sentiment_dist = {row['sentiment']: row['count'] for row in cur.fetchall()}
-        
-        # Total transactions
-        cur.execute("SELECT COUNT(*) as total FROM transactions")
-        total_transactions = cur.fetchone()['total']
-        
-        # Expedited refunds
-        cur.execute("SELECT COUNT(*) as total FROM transactions WHERE priority = 'high'")
-        expedited_refunds = cur.fetchone()['total']
-        
-        # Pending refunds
-        cur.execute("SELECT COUNT(*) as total FROM transactions WHERE refund_status != 'processed'")
-        pending_refunds = cur.fetchone()['total']
-        
-        cur.close()
-        
-        return jsonify({
-            'total_reviews': total_reviews,
-            'sentiment_distribution': sentiment_dist,
-            'total_transactions': total_transactions,
-            'expedited_refunds': expedited_refunds,
-            'pending_refunds': pending_refunds
-        }), 200
+        return jsonify(fetch_stats(get_db())), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
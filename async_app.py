@@ -0,0 +1,234 @@
+"""
+Async (ASGI) serving mode for SwiftRefund
+
+Serves the same routes and JSON responses as app.py, but on an asyncio
+event loop:
+- MySQL calls run on a thread pool, each thread keeping its own connection
+- Sentiment scoring runs on a pre-warmed process pool so TextBlob work
+  does not hold the event loop's GIL
+
+Run with:
+    hypercorn async_app:app --bind 0.0.0.0:5000
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import mysql.connector
+from quart import Quart, render_template, request, jsonify
+from textblob import TextBlob
+
+from app import (
+    REVIEW_LAYOUT,
+    TRANSACTION_LAYOUT,
+    app as flask_app,
+    analyze_sentiment,
+    build_review_response,
+    fetch_reviews,
+    fetch_stats,
+    fetch_transactions,
+    get_customer_summary,
+    init_database,
+    insert_refund_transaction,
+    insert_review,
+    mark_refund_processed,
+)
+from fast_json import rows_response
+
+app = Quart(__name__)
+
+# Reuse the MySQL configuration of the Flask app
+for key in ('MYSQL_HOST', 'MYSQL_USER', 'MYSQL_PASSWORD', 'MYSQL_DB'):
+    app.config[key] = flask_app.config[key]
+
+# Pool sizes
+app.config['SENTIMENT_WORKERS'] = int(os.getenv('SENTIMENT_WORKERS', os.cpu_count() or 1))
+app.config['DB_THREADS'] = int(os.getenv('DB_THREADS', 32))
+
+# Connections idle longer than this are pinged before use, in case MySQL's
+# wait_timeout closed them
+app.config['DB_IDLE_PING_SECONDS'] = float(os.getenv('DB_IDLE_PING_SECONDS', 60))
+
+_executors = {}
+_db_local = threading.local()
+
+def _warm_sentiment_worker():
+    """Load TextBlob's lexicon once when a scoring process starts"""
+    TextBlob('Warm up the sentiment models').sentiment
+
+def _thread_db():
+    """Get the MySQL connection owned by the current DB thread"""
+    db = getattr(_db_local, 'db', None)
+    if db is not None and time.monotonic() - _db_local.last_used > app.config['DB_IDLE_PING_SECONDS']:
+        # Reconnect connections the server may have dropped while idle
+        try:
+            db.ping(reconnect=True, attempts=1)
+        except mysql.connector.Error:
+            _drop_thread_db(db)
+            db = None
+    if db is None:
+        db = mysql.connector.connect(
+            host=app.config['MYSQL_HOST'],
+            user=app.config['MYSQL_USER'],
+            password=app.config['MYSQL_PASSWORD'],
+            database=app.config['MYSQL_DB'],
+            autocommit=False
+        )
+        _db_local.db = db
+    return db
+
+def _drop_thread_db(db):
+    """Forget and close this thread's connection so the next call reconnects"""
+    _db_local.db = None
+    try:
+        db.close()
+    except Exception:
+        pass
+
+def _call_with_db(fn, *args):
+    """Run a database helper from app.py on this thread's connection"""
+    db = _thread_db()
+    try:
+        return fn(db, *args)
+    except (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError):
+        _drop_thread_db(db)
+        raise
+    finally:
+        _db_local.last_used = time.monotonic()
+        if _db_local.db is not None and db.in_transaction:
+            # End any open read snapshot, like closing the per-request connection does
+            try:
+                db.rollback()
+            except mysql.connector.Error:
+                _drop_thread_db(db)
+
+async def run_db(fn, *args):
+    """Run a blocking database helper without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executors['db'], _call_with_db, fn, *args)
+
+async def score_sentiment(text):
+    """Analyze sentiment on the process pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executors['sentiment'], analyze_sentiment, text)
+
+@app.before_serving
+async def start_executors():
+    """Initialize the database, start the DB thread pool and pre-warm the sentiment process pool"""
+    workers = app.config['SENTIMENT_WORKERS']
+    _executors['db'] = ThreadPoolExecutor(
+        max_workers=app.config['DB_THREADS'],
+        thread_name_prefix='swiftrefund-db'
+    )
+
+    # Create missing tables, since ASGI servers never run the __main__ block
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_executors['db'], init_database)
+    _executors['sentiment'] = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_warm_sentiment_worker
+    )
+
+    # Spawn every worker up front so the first requests don't pay for model loading
+    await asyncio.gather(*(score_sentiment('warm up') for _ in range(workers)))
+
+@app.after_serving
+async def stop_executors():
+    """Shut down the worker pools"""
+    for executor in _executors.values():
+        executor.shutdown(wait=True)
+    _executors.clear()
+
+@app.route('/')
+async def index():
+    """Home page with review submission form"""
+    return await render_template('index.html')
+
+@app.route('/submit_review', methods=['POST'])
+async def submit_review():
+    """Submit a customer review and analyze sentiment"""
+    try:
+        data = await request.get_json() if request.is_json else await request.form
+        customer_id = data.get('customer_id', f'customer_{datetime.now().timestamp()}')
+        review_text = data.get('review', '').strip()
+
+        if not review_text:
+            return jsonify({'error': 'Review text is required'}), 400
+
+        # Analyze sentiment
+        sentiment_data = await score_sentiment(review_text)
+
+        # Store review in database
+        review_id = await run_db(insert_review, customer_id, review_text, sentiment_data)
+
+        # If sentiment is negative, trigger a refund, expedited unless the customer's history is risky
+        transaction_id = None
+        expedited = True
+
+        if sentiment_data['sentiment'] == 'negative':
+            transaction_id, expedited = await run_db(insert_refund_transaction, customer_id, data.get('amount', 0), review_id)
+
+        return jsonify(build_review_response(review_id, sentiment_data, transaction_id, expedited)), 200
+
+    except Exception as e:
+        error_details = traceback.format_exc()
+        print(f"Error in submit_review: {error_details}")
+        return jsonify({'error': str(e), 'type': type(e).__name__}), 500
+
+@app.route('/reviews')
+async def get_reviews():
+    """Get all reviews with their sentiment analysis"""
+    try:
+        return rows_response(app, REVIEW_LAYOUT, await run_db(fetch_reviews)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/transactions')
+async def get_transactions():
+    """Get all transactions"""
+    try:
+        return rows_response(app, TRANSACTION_LAYOUT, await run_db(fetch_transactions)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/dashboard')
+async def dashboard():
+    """Dashboard to view reviews and transactions"""
+    return await render_template('dashboard.html')
+
+@app.route('/process_refund/<int:transaction_id>', methods=['POST'])
+async def process_refund(transaction_id):
+    """Manually process a refund"""
+    try:
+        await run_db(mark_refund_processed, transaction_id)
+
+        return jsonify({'message': 'Refund processed successfully', 'transaction_id': transaction_id}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/customers/<customer_id>/summary')
+async def customer_summary(customer_id):
+    """Get a customer's review and refund history aggregates"""
+    try:
+        summary = await run_db(get_customer_summary, customer_id)
+        return jsonify(summary), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stats')
+async def get_stats():
+    """Get statistics about reviews and refunds"""
+    try:
+        return jsonify(await run_db(fetch_stats)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+if __name__ == '__main__':
+    # The database is initialized by start_executors()
+    app.run(host='0.0.0.0', port=5000)
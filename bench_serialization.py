@@ -0,0 +1,95 @@
+"""
+Micro-benchmark for the /reviews and /transactions serialization path
+
+Compares the old path (dictionary rows with every column, through jsonify)
+with the fast path (tuple rows with only the dashboard columns, through
+fast_json), for a full 100-row page. Needs Flask but no MySQL server.
+
+Run with:
+    python bench_serialization.py
+"""
+import json
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask, jsonify
+
+import fast_json
+from fast_json import RowLayout, dumps_rows, rows_response
+
+ROWS = 100
+REPEAT = 5
+NUMBER = 200
+
+# Full rows as `SELECT t.*, r.review_text, r.sentiment` returned them
+ALL_COLUMNS = ('id', 'customer_id', 'amount', 'status', 'refund_status', 'review_id',
+               'priority', 'created_at', 'processed_at', 'review_text', 'sentiment')
+
+# Dashboard columns, as fetch_transactions() selects them
+LAYOUT = RowLayout('id', 'customer_id', 'amount', 'status', 'refund_status',
+                   'priority', 'created_at', 'sentiment')
+
+def make_rows():
+    """Build a page of transaction rows in both shapes"""
+    start = datetime(2026, 10, 19, 9, 30, 0)
+    full_rows = []
+    for i in range(ROWS):
+        full_rows.append(dict(zip(ALL_COLUMNS, (
+            i + 1,
+            f'customer_{i % 17}',
+            Decimal(f'{(i * 37) % 500}.{i % 100:02d}'),
+            'processing',
+            'expedited',
+            i + 1,
+            'high',
+            start - timedelta(minutes=i),
+            None,
+            'This product was terrible! It broke immediately after I received it.',
+            'negative'
+        ))))
+    tuple_rows = [tuple(row[column] for column in LAYOUT.columns) for row in full_rows]
+    return full_rows, tuple_rows
+
+def best_of(fn):
+    """Best per-call time in microseconds"""
+    return min(timeit.repeat(fn, repeat=REPEAT, number=NUMBER)) / NUMBER * 1e6
+
+def main():
+    app = Flask(__name__)
+    full_rows, tuple_rows = make_rows()
+
+    with app.app_context():
+        baseline = jsonify(full_rows).get_data()
+        trimmed = jsonify(LAYOUT.to_dicts(tuple_rows)).get_data()
+
+        def old_path():
+            return jsonify(full_rows).get_data()
+
+        def fast_path():
+            return rows_response(app, LAYOUT, tuple_rows).get_data()
+
+        encoders = [('fast_json (pure Python)', None)]
+        if fast_json.orjson is not None:
+            encoders.append(('fast_json (orjson)', fast_json.orjson))
+
+        old_us = best_of(old_path)
+        print(f"{ROWS} rows, {len(baseline)} bytes via jsonify with all columns")
+        print(f"  {'jsonify, all columns':<28}{old_us:9.1f} us/response")
+
+        installed = fast_json.orjson
+        try:
+            for name, encoder in encoders:
+                fast_json.orjson = encoder
+                body = dumps_rows(LAYOUT, tuple_rows)
+                assert json.loads(body) == json.loads(trimmed), f"{name} output differs from jsonify"
+                if encoder is None:
+                    assert body == trimmed, "pure-Python output is not byte-identical to jsonify"
+                fast_us = best_of(fast_path)
+                print(f"  {name:<28}{fast_us:9.1f} us/response "
+                      f"({old_us / fast_us:.1f}x, {len(body)} bytes)")
+        finally:
+            fast_json.orjson = installed
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Per-customer refund history aggregates for SwiftRefund
+
+Aggregates live in the customer_summaries table, keyed by customer_id, and are
+updated in the same transaction as the review or refund that changes them.
+Refund decisions read the summary with SELECT ... FOR UPDATE in the transaction
+that writes the refund, so concurrent refunds for one customer are decided one
+at a time at the cost of one primary-key lookup. CustomerSummaryCache keeps
+recently used summaries in memory for the summary endpoint.
+
+Expedited refunds count as refunds when they are created; refunds queued for
+review count only once they are processed. Refund times always come from
+MySQL's clock.
+"""
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS customer_summaries (
+        customer_id VARCHAR(100) PRIMARY KEY,
+        review_count INT NOT NULL DEFAULT 0,
+        negative_review_count INT NOT NULL DEFAULT 0,
+        refund_count INT NOT NULL DEFAULT 0,
+        total_refunded DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        last_refund_at TIMESTAMP NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+CREATE_MARKERS_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_markers (
+        name VARCHAR(100) PRIMARY KEY,
+        completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+BACKFILL_MARKER = 'customer_summaries_backfill'
+INIT_LOCK = 'swiftrefund_customer_summaries'
+
+# Rebuilds every summary from reviews/transactions; rerunning it recomputes the same rows
+BACKFILL_SQL = """
+    INSERT INTO customer_summaries
+        (customer_id, review_count, negative_review_count, refund_count, total_refunded, last_refund_at)
+    SELECT c.customer_id,
+           COALESCE(r.review_count, 0),
+           COALESCE(r.negative_review_count, 0),
+           COALESCE(t.refund_count, 0),
+           COALESCE(t.total_refunded, 0),
+           t.last_refund_at
+    FROM (
+        SELECT customer_id FROM reviews WHERE customer_id IS NOT NULL
+        UNION
+        SELECT customer_id FROM transactions WHERE customer_id IS NOT NULL
+    ) c
+    LEFT JOIN (
+        SELECT customer_id, COUNT(*) as review_count,
+               SUM(sentiment = 'negative') as negative_review_count
+        FROM reviews
+        GROUP BY customer_id
+    ) r ON r.customer_id = c.customer_id
+    LEFT JOIN (
+        SELECT customer_id, COUNT(*) as refund_count, SUM(amount) as total_refunded,
+               MAX(CASE WHEN priority = 'high' THEN created_at ELSE processed_at END) as last_refund_at
+        FROM transactions
+        WHERE refund_status != 'under_review'
+        GROUP BY customer_id
+    ) t ON t.customer_id = c.customer_id
+    ON DUPLICATE KEY UPDATE
+        review_count = VALUES(review_count),
+        negative_review_count = VALUES(negative_review_count),
+        refund_count = VALUES(refund_count),
+        total_refunded = VALUES(total_refunded),
+        last_refund_at = VALUES(last_refund_at)
+"""
+
+def ensure_customer_summaries(conn):
+    """Create customer_summaries and backfill it once, even with several workers starting together"""
+    cur = conn.cursor()
+    cur.execute(CREATE_TABLE_SQL)
+    cur.execute(CREATE_MARKERS_SQL)
+    
+    cur.execute("SELECT GET_LOCK(%s, 60)", (INIT_LOCK,))
+    if cur.fetchone()[0] != 1:
+        cur.close()
+        raise RuntimeError("Timed out waiting for another worker to initialize customer_summaries")
+    try:
+        cur.execute("SELECT 1 FROM schema_markers WHERE name = %s", (BACKFILL_MARKER,))
+        if cur.fetchone() is None:
+            # The marker commits with the backfill, so a failed backfill is retried on the next start
+            cur.execute(BACKFILL_SQL)
+            cur.execute("INSERT INTO schema_markers (name) VALUES (%s)", (BACKFILL_MARKER,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.execute("DO RELEASE_LOCK(%s)", (INIT_LOCK,))
+        cur.close()
+
+def empty_summary(customer_id):
+    """Summary for a customer with no reviews or refunds yet"""
+    return {
+        'customer_id': customer_id,
+        'review_count': 0,
+        'negative_review_count': 0,
+        'refund_count': 0,
+        'total_refunded': Decimal('0.00'),
+        'last_refund_at': None,
+        'seconds_since_last_refund': None
+    }
+
+def fetch_summary(db, customer_id, for_update=False):
+    """Load one customer's summary by primary key, optionally locking the row"""
+    if customer_id is None:
+        return empty_summary(customer_id)
+    
+    cur = db.cursor(dictionary=True)
+    cur.execute("""
+        SELECT customer_id, review_count, negative_review_count, refund_count,
+               total_refunded, last_refund_at,
+               TIMESTAMPDIFF(SECOND, last_refund_at, NOW()) as seconds_since_last_refund
+        FROM customer_summaries
+        WHERE customer_id = %s
+    """ + (" FOR UPDATE" if for_update else ""), (customer_id,))
+    row = cur.fetchone()
+    cur.close()
+    return row if row is not None else empty_summary(customer_id)
+
+def record_review(cur, customer_id, negative):
+    """Count a review in the customer's summary (caller commits)"""
+    if customer_id is None:
+        return
+    cur.execute("""
+        INSERT INTO customer_summaries (customer_id, review_count, negative_review_count)
+        VALUES (%s, 1, %s)
+        ON DUPLICATE KEY UPDATE
+            review_count = review_count + 1,
+            negative_review_count = negative_review_count + VALUES(negative_review_count)
+    """, (customer_id, int(negative)))
+
+def record_refund(cur, customer_id, amount):
+    """Count a refund made now in the customer's summary (caller commits)"""
+    if customer_id is None:
+        return
+    # GREATEST keeps last_refund_at from moving backwards when commits land out of order
+    cur.execute("""
+        INSERT INTO customer_summaries (customer_id, refund_count, total_refunded, last_refund_at)
+        VALUES (%s, 1, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            refund_count = refund_count + 1,
+            total_refunded = total_refunded + VALUES(total_refunded),
+            last_refund_at = GREATEST(COALESCE(last_refund_at, VALUES(last_refund_at)), VALUES(last_refund_at))
+    """, (customer_id, amount))
+
+class CustomerSummaryCache:
+    """Thread-safe LRU of customer summaries in front of customer_summaries
+
+    Served summaries (including seconds_since_last_refund) can be up to ttl
+    seconds old; refund decisions read the table directly instead.
+
+    Writers invalidate a customer's entry after committing, so the next read
+    reloads it. A load that races with an invalidation is not cached. Entries
+    also expire after ttl seconds, which bounds how long writes made by other
+    processes (other workers, or the other serving mode) go unseen.
+    """
+
+    def __init__(self, capacity=10000, ttl=5.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._loads = {}
+        self._lock = threading.Lock()
+
+    def get(self, db, customer_id):
+        """Return a customer's summary, loading it on a cache miss"""
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry is not None:
+                summary, loaded_at = entry
+                if time.monotonic() - loaded_at < self.ttl:
+                    self._entries.move_to_end(customer_id)
+                    return dict(summary)
+                del self._entries[customer_id]
+
+            # [loads in flight, invalidations seen while loading]
+            load = self._loads.setdefault(customer_id, [0, 0])
+            load[0] += 1
+            invalidations = load[1]
+
+        summary = None
+        try:
+            summary = fetch_summary(db, customer_id)
+        finally:
+            with self._lock:
+                load[0] -= 1
+                if load[0] == 0:
+                    del self._loads[customer_id]
+
+                # Only cache rows no writer has invalidated since the load started
+                if summary is not None and load[1] == invalidations:
+                    self._entries[customer_id] = (summary, time.monotonic())
+                    self._entries.move_to_end(customer_id)
+                    while len(self._entries) > self.capacity:
+                        self._entries.popitem(last=False)
+        return dict(summary)
+
+    def invalidate(self, customer_id):
+        """Drop a customer's entry after a committed write to their summary"""
+        with self._lock:
+            self._entries.pop(customer_id, None)
+            load = self._loads.get(customer_id)
+            if load is not None:
+                load[1] += 1
+
+    def clear(self):
+        """Drop every cached summary"""
+        with self._lock:
+            self._entries.clear()
+            for load in self._loads.values():
+                load[1] += 1
@@ -0,0 +1,80 @@
+"""
+Lean JSON serialization for row-heavy SwiftRefund responses
+
+Rows are fetched as tuples and mapped onto a precomputed column layout, then
+encoded with orjson when it is installed, or with a reused json.JSONEncoder
+otherwise. Decimal and datetime values are rendered exactly as Flask's default
+JSON provider renders them (str(Decimal) and RFC 822 dates in GMT).
+"""
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from operator import itemgetter
+
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def _format_datetime(dt):
+    """Same output as werkzeug.http.http_date() for a datetime, without email.utils"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return '%s, %02d %s %04d %02d:%02d:%02d GMT' % (
+        _DAYS[dt.weekday()], dt.day, _MONTHS[dt.month - 1], dt.year,
+        dt.hour, dt.minute, dt.second
+    )
+
+def _default(o):
+    """Encode the non-JSON types MySQL rows contain, like Flask's provider does"""
+    if isinstance(o, datetime):
+        return _format_datetime(o)
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, Decimal):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+_compact_encoder = json.JSONEncoder(default=_default, check_circular=False, separators=(',', ':'))
+_indented_encoder = json.JSONEncoder(default=_default, check_circular=False, indent=2)
+
+class RowLayout:
+    """Column layout for tuple rows returned by a fixed SELECT list
+
+    columns are the result column names in SELECT order. Keys are emitted
+    sorted, matching Flask's sort_keys output, without sorting per row.
+    """
+
+    def __init__(self, *columns):
+        self.columns = columns
+        order = sorted(range(len(columns)), key=columns.__getitem__)
+        self.keys = tuple(columns[i] for i in order)
+        self._pick = itemgetter(*order) if len(order) > 1 else lambda row: (row[order[0]],)
+
+    def to_dicts(self, rows):
+        """Map tuple rows to dicts with sorted keys"""
+        keys = self.keys
+        pick = self._pick
+        return [dict(zip(keys, pick(row))) for row in rows]
+
+def dumps_rows(layout, rows, indent=False):
+    """Serialize tuple rows to a JSON array (bytes, newline-terminated like Flask)"""
+    records = layout.to_dicts(rows)
+    if orjson is not None:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_APPEND_NEWLINE
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(records, default=_default, option=option)
+
+    encoder = _indented_encoder if indent else _compact_encoder
+    return (encoder.encode(records) + '\n').encode('utf-8')
+
+def rows_response(app, layout, rows):
+    """JSON response for tuple rows from a Flask or Quart app, indented in debug mode like jsonify"""
+    return app.response_class(dumps_rows(layout, rows, indent=app.debug), mimetype=app.json.mimetype)
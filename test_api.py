@@ -4,6 +4,7 @@ Run this after starting the Flask application
 """
 import requests
 import json
+import time
 
 BASE_URL = "http://localhost:5000"
 
@@ -116,14 +117,65 @@ def test_get_stats():
         print("✗ Test failed")
         return False
 
+def test_get_customer_summary():
+    """Test getting a customer's refund history summary"""
+    print("\n=== Test 7: Getting Customer Summary ===")
+    response = requests.get(f"{BASE_URL}/customers/test_customer_1/summary")
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    
+    if response.status_code == 200:
+        summary = response.json()
+        assert summary['customer_id'] == 'test_customer_1', "Expected summary for test_customer_1"
+        assert summary['negative_review_count'] >= 1, "Expected the negative review to be counted"
+        print("✓ Test passed: Successfully retrieved customer summary")
+        return True
+    else:
+        print("✗ Test failed")
+        return False
+
+def test_risky_customer_refund_queued_for_review():
+    """Test that repeated negative reviews queue the refund for review instead of expediting it"""
+    print("\n=== Test 8: Risky Customer Refund Queued for Review ===")
+    # Must match the server's REFUND_RISK_MAX_NEGATIVE_REVIEWS (default 3)
+    max_negative_reviews = 3
+    data = {
+        "customer_id": f"test_customer_risk_{int(time.time())}",
+        "amount": 10.00,
+        "review": "This product was terrible! It broke immediately. Very disappointed, worst purchase ever!"
+    }
+    
+    # The first reviews are refunded right away, which puts the customer inside the risk window
+    for _ in range(max_negative_reviews):
+        response = requests.post(f"{BASE_URL}/submit_review", json=data)
+        if response.status_code != 200 or response.json().get('refund_status') != 'expedited':
+            print(f"Response: {json.dumps(response.json(), indent=2)}")
+            print("✗ Test failed")
+            return False
+    
+    response = requests.post(f"{BASE_URL}/submit_review", json=data)
+    print(f"Status Code: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    
+    if response.status_code == 200:
+        result = response.json()
+        assert result['refund_triggered'] == True, "Expected a refund transaction"
+        assert result['refund_status'] == 'under_review', "Expected refund to be queued for review"
+        assert result['message'] == 'Refund queued for review due to customer refund history', "Unexpected message"
+        print("✓ Test passed: Risky customer's refund was queued for review")
+        return True
+    else:
+        print("✗ Test failed")
+        return False
+
 def test_process_refund(transaction_id):
     """Test processing a refund"""
     if not transaction_id:
-        print("\n=== Test 7: Processing Refund ===")
+        print("\n=== Test 9: Processing Refund ===")
         print("Skipped: No transaction ID available")
         return
     
-    print("\n=== Test 7: Processing Refund ===")
+    print("\n=== Test 9: Processing Refund ===")
     response = requests.post(f"{BASE_URL}/process_refund/{transaction_id}")
     print(f"Status Code: {response.status_code}")
     print(f"Response: {json.dumps(response.json(), indent=2)}")
@@ -159,6 +211,8 @@ def main():
     test_get_reviews()
     test_get_transactions()
     test_get_stats()
+    test_get_customer_summary()
+    test_risky_customer_refund_queued_for_review()
     test_process_refund(transaction_id)
     
     print("\n" + "=" * 50)